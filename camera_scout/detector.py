@@ -1,11 +1,95 @@
 import subprocess
+import sys
 import json
 import re
+import os
+import glob
+import hashlib
+import tempfile
+import concurrent.futures
+from collections import deque
 from typing import List, Dict, Optional, TypedDict
 from pathlib import Path
 
+if __package__:
+    from . import v4l2
+else:
+    # detector.py started directly as a script
+    import v4l2
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+_JSON_ERRORS = (json.JSONDecodeError,) + ((msgspec.DecodeError,) if msgspec else ())
+
+
+# format, size and fps lines of v4l2-ctl --list-formats-ext in one pass
+_SPECS_RE = re.compile(
+    rb"\[\d+\]:\s+'(?P<fmt>\w+)'"
+    rb"|Size:\s+Discrete\s+(?P<w>\d+)x(?P<h>\d+)"
+    rb"|\((?P<fps>\d+\.\d+)\s+fps\)"
+)
+_DEV_PREFIX = "/dev/video"
+_DEV_PREFIX_BYTES = _DEV_PREFIX.encode()
+# v4l2-ctl --list-devices: unindented camera name or indented video node
+_DEV_LINE_RE = re.compile(
+    rb"^(?P<name>(?![^\n]*:/dev/)[^ \t\r\n][^\n]*)"
+    rb"|^[ \t]+(?P<path>" + re.escape(_DEV_PREFIX_BYTES) + rb"\S*)",
+    re.MULTILINE,
+)
+_SYSFS_V4L_DIR = "/sys/class/video4linux"
+# per-user: $XDG_RUNTIME_DIR lives for one boot, like the v4l2-ctl output
+_V4L2_CACHE_DIR = (
+    Path(os.environ.get("XDG_RUNTIME_DIR") or "~/.cache").expanduser()
+    / "camera_scout"
+    / "v4l2"
+)
+_TOPOLOGY_SNAPSHOT = Path("~/.cache/camera_scout/topology.json").expanduser()
+
+# packaged config is located once at import
+_DEFAULT_CFG_NAME = "reference/base_cam_in_company.json"
+_CFG_SEARCH = (
+    Path.cwd(),
+    Path(__file__).parent,
+    Path(__file__).parent / "camera_scout",
+)
+_DEFAULT_CFG_PATH = next(
+    (
+        (root / _DEFAULT_CFG_NAME).resolve()
+        for root in _CFG_SEARCH
+        if (root / _DEFAULT_CFG_NAME).exists()
+    ),
+    None,
+)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """Write through a private temp file so readers never see a partial file"""
+    tmp = None
+    try:
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as tmp:
+            tmp.write(data)
+        os.replace(tmp.name, path)
+    except OSError:
+        if tmp is not None:
+            try:
+                os.unlink(tmp.name)
+            except OSError:
+                pass
+
 
 class CameraResearcher:
+    # config name -> resolved file, shared by all instances
+    _CONFIG_PATH_CACHE: Dict[str, Path] = {}
+
     def __init__(
         self,
         config_path: str = "/reference/base_cam_in_company.json",
@@ -21,172 +105,367 @@ class CameraResearcher:
         self.__codec_preferences = {"cam": "MJPG", "termal": "YUYV"}
         self._detailed_info: Optional[List]
         self._camera_stacks_by_group: Optional[List]
+        self._discovered: bool = False
 
-        self._discover_cameras()
-        if visualize and not self.__NO_CAM_FOUND:
-            self._draw_detailed_info()
+        # discovery is deferred to the first get_camera unless we draw now
+        if visualize:
+            self._ensure_discovered()
+            if not self.__NO_CAM_FOUND:
+                self._draw_detailed_info()
 
     def _load_config(self, path_json: str) -> Dict:
         """Load camera type configuration from JSON file"""
         try:
+            # an existing file at the given path still wins over the packaged one
+            if (
+                _DEFAULT_CFG_PATH
+                and path_json.lstrip("/") == _DEFAULT_CFG_NAME
+                and not Path(path_json).exists()
+            ):
+                global_path = _DEFAULT_CFG_PATH
+            elif path_json in self._CONFIG_PATH_CACHE:
+                global_path = self._CONFIG_PATH_CACHE[path_json]
+            else:
+                search_paths = [
+                    Path(path_json),
+                    Path(f"camera_scout/{path_json}"),
+                    Path(__file__).parent / path_json,
+                    Path(__file__).parent / "camera_scout/" / path_json,
+                    Path.cwd() / path_json,
+                ]
+
+                for path in search_paths:
+                    if path.exists():
+                        global_path = path.resolve()
+                        break
+                else:
+                    raise FileNotFoundError(path_json)
+
+                self._CONFIG_PATH_CACHE[path_json] = global_path
+
+            with open(global_path, "rb") as f:
+                data = f.read()
+            config = msgspec.json.decode(data) if msgspec else json.loads(data)
+
+        except (FileNotFoundError, *_JSON_ERRORS):
+            raise RuntimeError(
+                f"Failed to load camera config: check path to {path_json})"
+            )
 
-            search_paths = [
-                Path(path_json),
-                Path(f"camera_scout/{path_json}"),
-                Path(__file__).parent / path_json,
-                Path(__file__).parent / "camera_scout/" / path_json,
-                Path.cwd() / path_json,
-            ]
+        # matching is case-insensitive, lowercase config names once here
+        config = {
+            cam_type: [name.lower() for name in names]
+            for cam_type, names in config.items()
+        }
 
-            for path in search_paths:
-                if path.exists():
-                    global_path = path
-                    break
+        # name -> (config order, type), first type wins as before
+        self._name_to_type = {}
+        for cam_type, names in config.items():
+            for name in names:
+                self._name_to_type.setdefault(name, (len(self._name_to_type), cam_type))
+        self._type_matcher = self._build_type_matcher(list(self._name_to_type))
+        # lowercased cam name -> type, per instance since it depends on config
+        self._type_cache: Dict[str, str] = {}
+        return config
+
+    def _build_type_matcher(self, names: List[str]):
+        """Build one multi-pattern matcher over all config names"""
+        if not names:
+            return None
 
-            with open(global_path, "r") as f:
-                return json.load(f)
+        if ahocorasick is not None:
+            automaton = ahocorasick.Automaton()
+            for name in names:
+                automaton.add_word(name, name)
+            automaton.make_automaton()
+            return automaton
 
-        except (FileNotFoundError, json.JSONDecodeError, UnboundLocalError) as e:
-            raise RuntimeError(
-                f"Failed to load camera config: check path to {path_json})"
-            )
+        # lookahead keeps overlapping matches, so no name hides another
+        return re.compile("(?=(%s))" % "|".join(map(re.escape, names)))
+
+    def _ensure_discovered(self) -> None:
+        """Run camera discovery once, on first use"""
+        if not self._discovered:
+            # flag only after success, so a failure is raised again next call
+            self._discover_cameras()
+            self._discovered = True
 
     def _discover_cameras(self) -> None:
         """Discover all available cameras and analyze their capabilities"""
-        self._detailed_info = self._get_detailed_info()
-        if not self._detailed_info:
-            self.__NO_CAM_FOUND = True
-            print("No cameras detected\n")
-            return
-
-        self._get_cam_type()
-        self._get_best_cam_param()
+        signature = self._topology_signature()
+        self._detailed_info = self._load_topology_snapshot(signature)
+
+        if self._detailed_info is None:
+            self._detailed_info = self._get_detailed_info()
+            if not self._detailed_info:
+                self.__NO_CAM_FOUND = True
+                print("No cameras detected\n")
+                return
+
+            self._get_cam_type()
+            self._get_best_cam_param()
+            # a failed probe must not be cached, only complete results
+            if all(
+                device["cam_param"]
+                for device in self._detailed_info
+                if device["type"] in self.__codec_preferences
+            ):
+                self._save_topology_snapshot(signature)
+
         self._camera_stacks_by_group = self._group_cameras_by_type()
 
+    def _topology_signature(self) -> Optional[str]:
+        """Hash of attached devices and config, None if there is nothing to key"""
+        try:
+            nodes = sorted(
+                self._node_identity(path) for path in glob.glob(f"{_DEV_PREFIX}*")
+            )
+        except OSError:
+            return None
+        if not nodes:
+            return None
+
+        return hashlib.sha1(repr((nodes, self.__config)).encode()).hexdigest()
+
+    @staticmethod
+    def _node_identity(path: str) -> tuple:
+        """What a device node is: sysfs name and parent device, plus replug times"""
+        stat = os.stat(path)
+        sysfs = os.path.join(_SYSFS_V4L_DIR, os.path.basename(path))
+        try:
+            name = Path(sysfs, "name").read_text()
+        except OSError:
+            name = ""
+        device = os.path.realpath(os.path.join(sysfs, "device"))
+        return (path, stat.st_rdev, stat.st_mtime, stat.st_ctime, name, device)
+
+    def _load_topology_snapshot(self, signature: Optional[str]) -> Optional[List]:
+        """Read cached discovery result, None unless it matches signature"""
+        if signature is None:
+            return None
+        try:
+            snapshot = json.loads(_TOPOLOGY_SNAPSHOT.read_text())
+            if snapshot["signature"] == signature:
+                return snapshot["devices"] or None
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def _save_topology_snapshot(self, signature: Optional[str]) -> None:
+        """Atomically replace the snapshot with this discovery result"""
+        if signature is not None:
+            snapshot = {"signature": signature, "devices": self._detailed_info}
+            _atomic_write(_TOPOLOGY_SNAPSHOT, json.dumps(snapshot).encode())
+
     def _get_detailed_info(self) -> Optional[List]:
         """Получение и парсинг информации о камерах"""
+        if os.path.isdir(_SYSFS_V4L_DIR):
+            return self._get_sysfs_info()
+
         try:
-            result = subprocess.run(
+            output = self._run_v4l2_cached(
                 ["v4l2-ctl", "--list-devices"],
-                capture_output=True,
-                text=True,
+                glob.glob(f"{_DEV_PREFIX}*"),
             )
-            return self._parse_detailed_info(result.stdout)
+            return self._parse_detailed_info(output)
 
         except (subprocess.CalledProcessError, FileNotFoundError):
             print("Get error input from v4l2-ctl")
             return None
 
-    def _parse_detailed_info(self, output: str) -> Optional[List]:
+    def _get_sysfs_info(self) -> List:
+        """Collect cameras from sysfs, one entry per physical device"""
+        groups = {}
+        entries = [
+            entry
+            for entry in os.scandir(_SYSFS_V4L_DIR)
+            if entry.name.startswith("video") and entry.name[5:].isdigit()
+        ]
+
+        for entry in sorted(entries, key=lambda entry: int(entry.name[5:])):
+            device = os.path.realpath(os.path.join(entry.path, "device"))
+            # nodes of one usb camera sit on its interfaces, group by the device
+            if os.path.exists(os.path.join(device, "bInterfaceNumber")):
+                device = os.path.dirname(device)
+
+            if device not in groups:
+                try:
+                    name = Path(entry.path, "name").read_text()
+                except OSError:
+                    name = entry.name
+                groups[device] = self._new_device(name)
+            groups[device]["paths"].append(f"/dev/{entry.name}")
+
+        return list(groups.values())
+
+    def _run_v4l2_cached(
+        self, argv: List[str], keypaths: List[str], check: bool = False
+    ) -> bytes:
+        """Run v4l2-ctl, reusing cached stdout while keypaths stay unmodified"""
+        key = hashlib.blake2b(repr((argv, sorted(keypaths))).encode()).hexdigest()[:16]
+        cache = _V4L2_CACHE_DIR / f"{key}.txt"
+
+        if keypaths:
+            try:
+                newest = max(os.stat(path).st_mtime for path in keypaths)
+                if cache.stat().st_mtime > newest:
+                    return cache.read_bytes()
+            except OSError:
+                pass
+
+        result = subprocess.run(argv, capture_output=True, check=check)
+
+        if keypaths and result.returncode == 0:
+            _atomic_write(cache, result.stdout)
+
+        return result.stdout
+
+    def _parse_detailed_info(self, output: bytes) -> Optional[List]:
         """Парсинг вывода v4l2-ctl в структурированный формат"""
 
         devices = []
         current_device = {}
 
-        for line in output.splitlines():
-            line = line.rstrip()
-            if not line:
-                continue
+        # stay in bytes, only the fragments we keep get decoded
+        for match in _DEV_LINE_RE.finditer(output):
+            name, path = match.group("name", "path")
 
             # search cam name
-            if not line.startswith((" ", "\t")) and ":/dev/" not in line:
+            if name is not None:
                 if current_device:
                     devices.append(current_device)
-                current_device = {
-                    "name": line.replace(":", "").strip(),
-                    "type": "",
-                    "paths": [],
-                    "_id": [],
-                    "cam_param": {},
-                }
+                current_device = self._new_device(name.decode("utf-8", "replace"))
             # serach id name
-            elif line.strip().startswith("/dev/video"):
-                current_device["paths"].append(line.strip())
+            else:
+                current_device["paths"].append(path.decode("ascii"))
 
         if current_device:
             devices.append(current_device)
         return devices
 
+    @staticmethod
+    def _new_device(name: str) -> Dict:
+        return {
+            "name": name.replace(":", "").strip(),
+            "type": "",
+            "paths": [],
+            "_id": [],
+            "cam_param": {},
+        }
+
     def _get_cam_type(self):
         """Find cam type from json"""
         for device in self._detailed_info:
-            device["type"] = self._find_type(device["name"], self.__config)
+            device["type"] = self._find_type(device["name"].lower())
 
-    def _find_type(self, cam_name: str, fcc_data: json) -> str:
-        """Search simulars betwen json and cam name"""
-        for cam_type, names in fcc_data.items():
-            for name in names:
-                if name.lower() in cam_name.lower():
-                    return cam_type
-        assert "Not find cam type, check .json"
+    def _find_type(self, cam_name: str) -> str:
+        """Search simulars betwen json and lowercased cam name"""
+        if cam_name not in self._type_cache:
+            self._type_cache[cam_name] = self._match_type(cam_name)
+        return self._type_cache[cam_name]
 
-    def _get_best_cam_param(self):
-        """find best paramerts for all find cam"""
-        for device in self._detailed_info:
-            if device["type"] == "realsense" or device["type"] == "":
-                continue
+    def _match_type(self, cam_name: str) -> str:
+        if self._type_matcher is None:
+            return ""
 
-            cam_codec = self.__codec_preferences[device["type"]]
-            main_path = device["paths"][0]
-            cam_id = int(main_path[-1])
+        if ahocorasick is not None:
+            found = [name for _, name in self._type_matcher.iter(cam_name)]
+        else:
+            found = [m.group(1) for m in self._type_matcher.finditer(cam_name)]
 
-            all_specs = self._get_camera_specs(main_path, cam_codec)
-            best_specs = all_specs[0]
+        if not found:
+            return ""
+        return min(self._name_to_type[name] for name in found)[1]
 
-            device["_id"] = cam_id
-            device["cam_param"] = best_specs
+    def _get_best_cam_param(self):
+        """find best paramerts for all find cam"""
+        targets = [
+            (device, self.__codec_preferences[device["type"]])
+            for device in self._detailed_info
+            if device["type"] in self.__codec_preferences
+        ]
+
+        # v4l2-ctl calls are independent, so run them all at once
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, len(targets))
+        ) as executor:
+            results = list(
+                executor.map(
+                    lambda target: self._get_camera_specs(
+                        target[0]["paths"][0], target[1]
+                    ),
+                    targets,
+                )
+            )
+
+        for (device, _), all_specs in zip(targets, results):
+            device["_id"] = int(device["paths"][0][-1])
+            device["cam_param"] = all_specs[0] if all_specs else {}
 
     def _get_camera_specs(self, device_path, cam_codec) -> Optional[List]:
-        """Получить характеристики камеры для форматов MJPG и YUYV"""
+        """Получить лучший (первый в списке драйвера) режим для MJPG или YUYV"""
         try:
-            result = subprocess.run(
+            specs = v4l2.iter_capture_specs(device_path, cam_codec)
+            try:
+                first = next(specs, None)
+            finally:
+                specs.close()
+            return [first] if first else []
+        except OSError:
+            # no direct access to the node, let v4l2-ctl try
+            pass
+
+        try:
+            output = self._run_v4l2_cached(
                 ["v4l2-ctl", "-d", device_path, "--list-formats-ext"],
-                capture_output=True,
-                text=True,
+                [device_path],
                 check=True,
             )
-            output = result.stdout
-
-            specs = []
-            current_format = None
-            current_res = None
-
-            for line in output.splitlines():
-                # Определяем текущий формат
-                fmt_match = re.match(r"\s*\[\d+\]:\s+\'(\w+)\'.*", line)
-                if fmt_match:
-                    current_format = fmt_match.group(1)
-                    current_res = None
-                    continue
-
-                # Фильтруем только нужные
-                if current_format not in {cam_codec}:
-                    continue
-
-                # Определяем разрешение
-                size_match = re.match(r"\s*Size:\s+Discrete\s+(\d+)x(\d+)", line)
-                if size_match:
-                    current_res = (int(size_match.group(1)), int(size_match.group(2)))
-                    continue
-
-                # Парсим FPS для текущего формата и разрешения
-                if current_res:
-                    fps_match = re.search(r"\((\d+\.\d+)\s+fps\)", line)
-                    if fps_match:
-                        fps = float(fps_match.group(1))
-                        specs.append(
-                            {
-                                "format": current_format,
-                                "width": current_res[0],
-                                "height": current_res[1],
-                                "fps": fps,
-                            }
-                        )
-            return specs
-
-        except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+            return self._parse_camera_specs(output, cam_codec)
+
+        except (
+            subprocess.CalledProcessError,
+            FileNotFoundError,
+            ValueError,
+        ):
             return []
 
+    def _parse_camera_specs(self, output: bytes, cam_codec: str) -> List:
+        """Парсинг вывода v4l2-ctl --list-formats-ext до первого режима"""
+        current_format = None
+        current_res = None
+
+        for match in _SPECS_RE.finditer(output):
+            kind = match.lastgroup
+
+            # Определяем текущий формат
+            if kind == "fmt":
+                # interned like the codec literals, != short-circuits on identity
+                current_format = sys.intern(match.group("fmt").decode("ascii"))
+                current_res = None
+                continue
+
+            # Фильтруем только нужные
+            if current_format != cam_codec:
+                continue
+
+            # Определяем разрешение
+            if kind == "h":
+                current_res = (int(match.group("w")), int(match.group("h")))
+                continue
+
+            # Первый FPS для нужного формата и разрешения и есть лучший режим
+            if current_res:
+                return [
+                    {
+                        "format": current_format,
+                        "width": current_res[0],
+                        "height": current_res[1],
+                        "fps": float(match.group("fps")),
+                    }
+                ]
+        return []
+
     def _draw_detailed_info(self) -> None:
         """Draw all usb cameras specifics"""
         print("Cam info:")
@@ -210,11 +489,13 @@ class CameraResearcher:
 
     def _group_cameras_by_type(self) -> List:
         """Группирует камеры по типам в стекоподобную структуру"""
-        stacks = {"termal": [], "cam": [], "realsense": []}
+        stacks = {"termal": deque(), "cam": deque(), "realsense": deque()}
 
         for camera in self._detailed_info:
             camera_type = camera["type"]
-            stacks[camera_type].append(camera)
+            # cameras missing from the config have no stack to go to
+            if camera_type in stacks:
+                stacks[camera_type].append(camera)
 
         print("All find:")
         for cam_name in stacks:
@@ -223,19 +504,27 @@ class CameraResearcher:
         return stacks
 
     def get_camera(self, cam_type):
-        camera_data = None
+        return self.get_any([cam_type])[0]
+
+    def get_any(self, cam_types: List[str]) -> List[Optional[Dict]]:
+        """Pop one camera of each requested type, None where there is none"""
+        self._ensure_discovered()
 
         if self.__NO_CAM_FOUND:
-            print(f"CameraResearcher not found {cam_type} in system")
-            return camera_data
+            for cam_type in cam_types:
+                print(f"CameraResearcher not found {cam_type} in system")
+            return [None] * len(cam_types)
 
-        try:
-            camera_data = self._camera_stacks_by_group[cam_type].pop()
-            print(f"Sucess!")
-        except IndexError:
-            print(f"You get all possible {cam_type}")
+        cameras = []
+        for cam_type in cam_types:
+            try:
+                cameras.append(self._camera_stacks_by_group[cam_type].pop())
+                print(f"Sucess!")
+            except IndexError:
+                cameras.append(None)
+                print(f"You get all possible {cam_type}")
 
-        return camera_data
+        return cameras
 
 
 def main():
@@ -243,13 +532,11 @@ def main():
         config_path="reference/base_cam_in_company.json", visualize=False
     )
 
-    if cam := Resercher.get_camera("cam"):
-        print(f"Using camera: {cam['name']}")
-        print(f"Resolution: {cam['cam_param']['width']}x{cam['cam_param']['height']}")
-
-    if cam := Resercher.get_camera("termal"):
-        print(f"Using camera: {cam['name']}")
-        print(f"Resolution: {cam['cam_param']['width']}x{cam['cam_param']['height']}")
+    for cam in Resercher.get_any(["cam", "termal"]):
+        if cam:
+            print(f"Using camera: {cam['name']}")
+            if cam_param := cam["cam_param"]:
+                print(f"Resolution: {cam_param['width']}x{cam_param['height']}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,197 @@
+import ctypes
+import errno
+import fcntl
+import os
+import sys
+from typing import Dict, Iterator, Optional
+
+# Definitions from <linux/videodev2.h>
+V4L2_BUF_TYPE_VIDEO_CAPTURE = 1
+V4L2_FMT_FLAG_EMULATED = 0x0002
+V4L2_FRMSIZE_TYPE_DISCRETE = 1
+V4L2_FRMIVAL_TYPE_DISCRETE = 1
+
+
+class v4l2_fmtdesc(ctypes.Structure):
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("flags", ctypes.c_uint32),
+        ("description", ctypes.c_char * 32),
+        ("pixelformat", ctypes.c_uint32),
+        ("mbus_code", ctypes.c_uint32),
+        ("reserved", ctypes.c_uint32 * 3),
+    ]
+
+
+class v4l2_frmsize_discrete(ctypes.Structure):
+    _fields_ = [("width", ctypes.c_uint32), ("height", ctypes.c_uint32)]
+
+
+class v4l2_frmsize_stepwise(ctypes.Structure):
+    _fields_ = [
+        ("min_width", ctypes.c_uint32),
+        ("max_width", ctypes.c_uint32),
+        ("step_width", ctypes.c_uint32),
+        ("min_height", ctypes.c_uint32),
+        ("max_height", ctypes.c_uint32),
+        ("step_height", ctypes.c_uint32),
+    ]
+
+
+class _frmsize_union(ctypes.Union):
+    _fields_ = [
+        ("discrete", v4l2_frmsize_discrete),
+        ("stepwise", v4l2_frmsize_stepwise),
+    ]
+
+
+class v4l2_frmsizeenum(ctypes.Structure):
+    _anonymous_ = ("u",)
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("pixel_format", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("u", _frmsize_union),
+        ("reserved", ctypes.c_uint32 * 2),
+    ]
+
+
+class v4l2_fract(ctypes.Structure):
+    _fields_ = [("numerator", ctypes.c_uint32), ("denominator", ctypes.c_uint32)]
+
+
+class v4l2_frmival_stepwise(ctypes.Structure):
+    _fields_ = [("min", v4l2_fract), ("max", v4l2_fract), ("step", v4l2_fract)]
+
+
+class _frmival_union(ctypes.Union):
+    _fields_ = [("discrete", v4l2_fract), ("stepwise", v4l2_frmival_stepwise)]
+
+
+class v4l2_frmivalenum(ctypes.Structure):
+    _anonymous_ = ("u",)
+    _fields_ = [
+        ("index", ctypes.c_uint32),
+        ("pixel_format", ctypes.c_uint32),
+        ("width", ctypes.c_uint32),
+        ("height", ctypes.c_uint32),
+        ("type", ctypes.c_uint32),
+        ("u", _frmival_union),
+        ("reserved", ctypes.c_uint32 * 2),
+    ]
+
+
+def _iowr(nr: int, struct_type) -> int:
+    return (3 << 30) | (ctypes.sizeof(struct_type) << 16) | (ord("V") << 8) | nr
+
+
+VIDIOC_ENUM_FMT = _iowr(2, v4l2_fmtdesc)
+VIDIOC_ENUM_FRAMESIZES = _iowr(74, v4l2_frmsizeenum)
+VIDIOC_ENUM_FRAMEINTERVALS = _iowr(75, v4l2_frmivalenum)
+
+
+def _load_libv4l2():
+    """libv4l2 handles devices that need its plugins, optional"""
+    try:
+        lib = ctypes.CDLL("libv4l2.so.0", use_errno=True)
+    except OSError:
+        return None
+
+    lib.v4l2_open.argtypes = (ctypes.c_char_p, ctypes.c_int)
+    lib.v4l2_open.restype = ctypes.c_int
+    lib.v4l2_ioctl.argtypes = (ctypes.c_int, ctypes.c_ulong, ctypes.c_void_p)
+    lib.v4l2_ioctl.restype = ctypes.c_int
+    lib.v4l2_close.argtypes = (ctypes.c_int,)
+    lib.v4l2_close.restype = ctypes.c_int
+    return lib
+
+
+_libv4l2 = _load_libv4l2()
+
+
+def _raise_errno(path: Optional[str] = None):
+    err = ctypes.get_errno()
+    raise OSError(err, os.strerror(err), path)
+
+
+def _open(device_path: str) -> int:
+    flags = os.O_RDWR | os.O_NONBLOCK
+    if _libv4l2 is None:
+        return os.open(device_path, flags)
+
+    fd = _libv4l2.v4l2_open(os.fsencode(device_path), flags)
+    if fd < 0:
+        _raise_errno(device_path)
+    return fd
+
+
+def _ioctl(fd: int, request: int, arg) -> None:
+    if _libv4l2 is None:
+        fcntl.ioctl(fd, request, arg)
+    elif _libv4l2.v4l2_ioctl(fd, request, ctypes.byref(arg)) < 0:
+        _raise_errno()
+
+
+def _close(fd: int) -> None:
+    if _libv4l2 is None:
+        os.close(fd)
+    else:
+        _libv4l2.v4l2_close(fd)
+
+
+def _fourcc(pixelformat: int) -> str:
+    return sys.intern(pixelformat.to_bytes(4, "little").decode("ascii", "replace"))
+
+
+def _enum(fd: int, request: int, arg) -> Iterator:
+    """Yield arg for index 0, 1, ... until the driver answers EINVAL"""
+    index = 0
+    while True:
+        arg.index = index
+        try:
+            _ioctl(fd, request, arg)
+        except OSError as e:
+            if e.errno == errno.EINVAL:
+                return
+            raise
+        yield arg
+        index += 1
+
+
+def iter_capture_specs(device_path: str, pixel_format: str) -> Iterator[Dict]:
+    """Yield discrete sizes and frame rates of device_path for one format"""
+    fd = _open(device_path)
+    try:
+        fmt = v4l2_fmtdesc(type=V4L2_BUF_TYPE_VIDEO_CAPTURE)
+        for fmt in _enum(fd, VIDIOC_ENUM_FMT, fmt):
+            # skip formats libv4l2 converts in software, v4l2-ctl lists none
+            if fmt.flags & V4L2_FMT_FLAG_EMULATED:
+                continue
+            if _fourcc(fmt.pixelformat) != pixel_format:
+                continue
+
+            size = v4l2_frmsizeenum(pixel_format=fmt.pixelformat)
+            for size in _enum(fd, VIDIOC_ENUM_FRAMESIZES, size):
+                if size.type != V4L2_FRMSIZE_TYPE_DISCRETE:
+                    break
+                width, height = size.discrete.width, size.discrete.height
+
+                ival = v4l2_frmivalenum(
+                    pixel_format=fmt.pixelformat, width=width, height=height
+                )
+                for ival in _enum(fd, VIDIOC_ENUM_FRAMEINTERVALS, ival):
+                    if ival.type != V4L2_FRMIVAL_TYPE_DISCRETE:
+                        break
+                    frac = ival.discrete
+                    if not frac.numerator:
+                        continue
+                    yield {
+                        "format": pixel_format,
+                        "width": width,
+                        "height": height,
+                        # same precision v4l2-ctl prints
+                        "fps": round(frac.denominator / frac.numerator, 3),
+                    }
+    finally:
+        _close(fd)